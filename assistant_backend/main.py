@@ -1,85 +1,167 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+from pydantic import BaseModel, ConfigDict
 from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uuid
-import json
+import re
+import orjson
 import asyncio
-from mcp_client_gen import MCPClientManager
+import time
+import logging
+import logging.handlers
+import queue
+from mcp_client_gen import MCPClientManager, encode_event, encode_result
+from mcp_client import MCPClientManager as LegacyClientManager
 import os
 
-app = FastAPI(title="Assistant Backend")
+# Logging: records are handed to a queue and written by a background thread,
+# so stderr I/O never blocks the event loop. Set LOG_LEVEL=DEBUG for tracing.
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_log_listener.start()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Tear down MCP connections deterministically on shutdown
+    await global_manager.aclose()
+    await legacy_manager.close()
+    _log_listener.stop()
+
+app = FastAPI(title="Assistant Backend", lifespan=lifespan)
 
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8001/sse")
 # For POC, use a global manager (single user assumption)
 global_manager = MCPClientManager(MCP_SERVER_URL)
 
+# Tool list cache: tools rarely change, so avoid an MCP round-trip per /tools hit
+TOOLS_CACHE_TTL = 30 # seconds
+_tools_cache = {"ts": 0.0, "payload": None}
+# Coalesces concurrent cache misses into a single list_tools call
+_tools_lock = asyncio.Lock()
+
+def _cached_tools():
+    if _tools_cache["payload"] is not None and time.monotonic() - _tools_cache["ts"] < TOOLS_CACHE_TTL:
+        return _tools_cache["payload"]
+    return None
+
+def invalidate_tools_cache():
+    _tools_cache["ts"] = 0.0
+    _tools_cache["payload"] = None
+
+global_manager.on_tools_changed = invalidate_tools_cache
+
 # Legacy Client
-from mcp_client import MCPClientManager as LegacyClientManager
 legacy_manager = LegacyClientManager()
 
+# Chat intent keywords, in priority order (first listed wins when several occur).
+# Longer keywords precede their prefixes so "ticket v2" is not cut short to "ticket".
+INTENT_KEYWORDS = ("ticket v2", "tickt v2", "login v2", "book v2", "appointment", "ticket", "login", "debug")
+INTENT_RE = re.compile("|".join(re.escape(k) for k in INTENT_KEYWORDS))
+_INTENT_RANK = {k: i for i, k in enumerate(INTENT_KEYWORDS)}
+
+# Intent keyword -> builder(lowercased message) returning (tool_name, tool_args).
+# Messages without a known intent go to simple_tool.
+ROUTES = {
+    "ticket v2": lambda m: ("create_ticket_v2", {"initial_description": m}),
+    "tickt v2": lambda m: ("create_ticket_v2", {"initial_description": m}),
+    "login v2": lambda m: ("login_v2", {}),
+    "book v2": lambda m: ("book_appointment_v2", {}),
+    "appointment": lambda m: ("book_appointment_v2", {}),
+    # Fallback to v1 if not explicitly v2
+    "ticket": lambda m: ("create_ticket", {"initial_description": m if "printer" in m else "No desc"}),
+    "login": lambda m: ("oauth_auth", {}),
+    "debug": lambda m: ("debug_elicitation", {}),
+}
+
+def detect_intent(message: str) -> Optional[str]:
+    """
+    Scan the (lowercased) message once and return the highest-priority keyword found.
+    """
+    matches = INTENT_RE.findall(message)
+    return min(matches, key=_INTENT_RANK.__getitem__) if matches else None
+
 class ChatRequest(BaseModel):
     message: str
     user_id: str
     session_id: Optional[str] = None
 
 class ElicitationSubmission(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     session_id: str 
     response_data: Dict[str, Any]
-    is_v1: Optional[bool] = False
+    # v1 (legacy) submissions carry the tool to re-call at top level
     is_v1: Optional[bool] = False
     tool_name: Optional[str] = None
 
+async def _sse_events(events):
+    """
+    SSE framing: each NDJSON line becomes the data of one ServerSentEvent.
+    """
+    async for payload in events:
+        yield ServerSentEvent(data=payload[:-1].decode())
+
+def stream_events(http_request: Request, events):
+    """
+    Pick the response framing from the client's Accept header.
+    SSE clients also get keep-alive pings during long elicitations;
+    everyone else keeps receiving application/x-ndjson.
+    """
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return EventSourceResponse(_sse_events(events))
+    # Events are already NDJSON lines, stream them as-is
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
 @app.get("/tools")
 async def get_tools():
     """
-    List available tools.
+    List available tools (cached for TOOLS_CACHE_TTL seconds).
     """
+    payload = _cached_tools()
+    if payload is not None:
+        return payload
     try:
-        result = await global_manager.list_tools()
-        # Clean up result for UI
-        tools = []
-        if result and hasattr(result, 'tools'):
-             for t in result.tools:
-                 tools.append({
-                     "name": t.name,
-                     "description": t.description
-                 })
-        return {"tools": tools, "server_url": MCP_SERVER_URL}
+        async with _tools_lock:
+            # Another request may have refreshed the cache while we waited
+            payload = _cached_tools()
+            if payload is not None:
+                return payload
+
+            result = await global_manager.list_tools()
+            # Clean up result for UI
+            tools = []
+            if result and hasattr(result, 'tools'):
+                 for t in result.tools:
+                     tools.append({
+                         "name": t.name,
+                         "description": t.description
+                     })
+            payload = {"tools": tools, "server_url": MCP_SERVER_URL}
+            _tools_cache["payload"] = payload
+            _tools_cache["ts"] = time.monotonic()
+            return payload
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to list tools")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     # Determine intent
     message = request.message.lower()
-    tool_name = "simple_tool"
-    tool_args = {"message": request.message}
-
-    if "ticket v2" in message or "tickt v2" in message:
-        tool_name = "create_ticket_v2"
-        tool_args = {"initial_description": message}
-    elif "login v2" in message:
-        tool_name = "login_v2"
-        tool_args = {}
-    elif "book v2" in message or "appointment" in message:
-        tool_name = "book_appointment_v2"
-        tool_args = {}
-    elif "ticket" in message: # Fallback to v1 if not explicitly v2
-        tool_name = "create_ticket" 
-        if "printer" in message:
-             tool_args["initial_description"] = message
-        else:
-             tool_args["initial_description"] = "No desc"
-    elif "login" in message: # Fallback
-        tool_name = "oauth_auth"
-        tool_args = {}
-    elif "debug" in message:
-        tool_name = "debug_elicitation"
-        tool_args = {}
+    intent = detect_intent(message)
+    if intent is not None:
+        tool_name, tool_args = ROUTES[intent](message)
+    else:
+        tool_name, tool_args = "simple_tool", {"message": request.message}
 
     # Check if it is a v2 tool (requires streaming)
     # Added "debug" to v2 check
@@ -88,10 +170,7 @@ async def chat(request: ChatRequest):
          sid = request.session_id or str(uuid.uuid4())
          # This is now a synchronous call that spawns a background task internally
          global_manager.start_tool_task(sid, tool_name, tool_args)
-         return StreamingResponse(
-            global_manager.attach_to_running_task(sid),
-            media_type="application/x-ndjson"
-        )
+         return stream_events(http_request, global_manager.attach_to_running_task(sid))
     # v1 logic (Legacy)
     # We use a separate generator to stream the result similarly to v2
     async def v1_generator():
@@ -104,53 +183,43 @@ async def chat(request: ChatRequest):
             if result.content:
                 text_content = result.content[0].text
                 
-                # Try to parse as JSON to check for elicitation
-                try:
-                    data = json.loads(text_content)
-                    if isinstance(data, dict) and data.get("type") == "elicitation":
-                        # It is a v1 elicitation!
-                        # Add v1 metadata
-                        data["is_v1"] = True
-                        data["tool_name"] = tool_name
-                        # Wrap in event
-                        event = {
-                            "type": "elicitation",
-                            "content": {
-                                "elicitation_type": data.get("elicitation_type", "form"),
-                                "data": data # Contains 'fields', 'message', etc.
-                            }
-                        }
-                        yield json.dumps(event) + "\n"
-                        return
-                except json.JSONDecodeError:
-                    pass
+                # Try to parse as JSON to check for elicitation.
+                # Elicitations are JSON objects, so plain-text results skip the
+                # parse (and the decode error) entirely.
+                data = None
+                if text_content.startswith("{"):
+                    try:
+                        data = orjson.loads(text_content)
+                    except orjson.JSONDecodeError:
+                        pass
+                if isinstance(data, dict) and data.get("type") == "elicitation":
+                    # It is a v1 elicitation!
+                    # Add v1 metadata
+                    data["is_v1"] = True
+                    data["tool_name"] = tool_name
+                    # Wrap in event
+                    yield encode_event("elicitation", {
+                        "elicitation_type": data.get("elicitation_type", "form"),
+                        # OAuth state for URL elicitations, so clients needn't parse the URL
+                        "state": data.get("context_data", {}).get("state"),
+                        "data": data # Contains 'fields', 'message', etc.
+                    })
+                    return
                 
                 # Normal Result
-                yield json.dumps({"type": "result", "content": text_content}) + "\n"
+                yield encode_result(text_content)
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            yield json.dumps({"type": "error", "content": str(e)}) + "\n"
+            yield encode_event("error", str(e))
 
-    return StreamingResponse(
-        v1_generator(),
-        media_type="application/x-ndjson"
-    )
+    return stream_events(http_request, v1_generator())
 
 @app.post("/submit_elicitation")
-async def submit_elicitation(submission: ElicitationSubmission):
+async def submit_elicitation(submission: ElicitationSubmission, http_request: Request):
     """
     Called by UI to resume.
     """
     # Check if this is a v1 legacy submission
-    # We might need to extend ElicitationSubmission model or check the dict
-    # But ElicitationSubmission is Pydantic. 'response_data' is Dict.
-    # The UI sends 'is_v1' and 'tool_name' at top level? 
-    # Let's check UI code: json=submission where submission includes is_v1.
-    # We need to update ElicitationSubmission model.
-    pass
-
-    if hasattr(submission, "is_v1") and submission.is_v1:
+    if submission.is_v1:
         # V1 Logic: Call the tool again with the data
         tool_name = submission.tool_name
         response_data = submission.response_data
@@ -180,20 +249,14 @@ async def submit_elicitation(submission: ElicitationSubmission):
                 # Same result processing as chat
                 if result.content:
                     text_content = result.content[0].text
-                    yield json.dumps({"type": "result", "content": text_content}) + "\n"
+                    yield encode_result(text_content)
             except Exception as e:
-                yield json.dumps({"type": "error", "content": str(e)}) + "\n"
+                yield encode_event("error", str(e))
 
-        return StreamingResponse(
-            v1_submit_generator(),
-            media_type="application/x-ndjson"
-        )
+        return stream_events(http_request, v1_submit_generator())
             
     # Regular V2 Logic
     # Pass session_id
     await global_manager.submit_response(submission.session_id, submission.response_data)
     
-    return StreamingResponse(
-        global_manager.attach_to_running_task(submission.session_id),
-        media_type="application/x-ndjson"
-    )
+    return stream_events(http_request, global_manager.attach_to_running_task(submission.session_id))
@@ -1,4 +1,8 @@
 from contextlib import AsyncExitStack
+from typing import Optional
+import asyncio
+import logging
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
@@ -6,33 +10,76 @@ import os
 
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8001/sse")
 
+logger = logging.getLogger(__name__)
+
+# Errors meaning the persistent session is gone and a reconnect may help
+RECONNECT_ERRORS = (ConnectionError, anyio.ClosedResourceError, anyio.BrokenResourceError)
+
 class MCPClientManager:
     def __init__(self):
-        self.session = None
-        self.exit_stack = AsyncExitStack()
+        self.session: Optional[ClientSession] = None
+        self.exit_stack: Optional[AsyncExitStack] = None
+        # Serializes (re)connects so concurrent first calls share one handshake
+        self._lock = asyncio.Lock()
+        self._runner: Optional[asyncio.Task] = None
+        self._closed = asyncio.Event()
 
     async def connect(self):
-        # We use SSE transport
-        # Note: FastMCP at /sse creates the SSE endpoint
+        """
+        Open a long-lived SSE stream + ClientSession and wait until it is initialized.
+        The context managers are held by a background task, since the anyio task
+        groups inside sse_client must be entered and exited by the same task.
+        """
+        ready = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._runner = asyncio.create_task(self._run(ready))
+        await ready.wait()
+        if self.session is None:
+            raise ConnectionError(f"Could not connect to MCP server at {MCP_SERVER_URL}")
+
+    async def _run(self, ready: asyncio.Event):
         try:
-            # We must enter the context managers
-            # In a real long-running app this is tricky. We'll open it per request or keep a global session?
-            # Standard mcp client is often used as a context manager.
-            # For this POC, let's try to establish a persistent session or re-connect.
-            pass
+            async with AsyncExitStack() as stack:
+                self.exit_stack = stack
+                streams = await stack.enter_async_context(sse_client(MCP_SERVER_URL))
+                session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                await session.initialize()
+                self.session = session
+                ready.set()
+                # Keep the session open until close()
+                await self._closed.wait()
         except Exception as e:
-            print(f"Connection error: {e}")
-            raise
+            logger.error("Connection error: %s", e)
+        finally:
+            self.session = None
+            self.exit_stack = None
+            ready.set() # Unblock connect() if we failed
+
+    async def close(self):
+        self._closed.set()
+        if self._runner is not None:
+            await self._runner
+            self._runner = None
+
+    async def _ensure(self) -> ClientSession:
+        async with self._lock:
+            if self.session is None:
+                await self.connect()
+            return self.session
+
+    async def _with_session(self, op):
+        """
+        Run op(session) on the persistent session, reconnecting once if it dropped.
+        """
+        try:
+            return await op(await self._ensure())
+        except RECONNECT_ERRORS as e:
+            logger.warning("MCP session lost (%s), reconnecting", e)
+            await self.close()
+            return await op(await self._ensure())
 
     async def list_tools(self):
-        # Re-connect for each operation (simplest for avoiding stale connections in POC)
-        async with sse_client(MCP_SERVER_URL) as streams:
-            async with ClientSession(streams[0], streams[1]) as session:
-                await session.initialize()
-                return await session.list_tools()
+        return await self._with_session(lambda session: session.list_tools())
 
     async def call_tool(self, name: str, arguments: dict):
-        async with sse_client(MCP_SERVER_URL) as streams:
-            async with ClientSession(streams[0], streams[1]) as session:
-                await session.initialize()
-                return await session.call_tool(name, arguments)
+        return await self._with_session(lambda session: session.call_tool(name, arguments))
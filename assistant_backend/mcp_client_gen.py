@@ -1,61 +1,185 @@
 
 import asyncio
+import collections
 import logging
-import json
+import orjson
 import traceback
-from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, List
 
 # mcp imports
 from mcp.client.sse import sse_client
 from mcp.client.session import ClientSession
-from mcp.types import ElicitResult
+from mcp.types import ElicitResult, InitializeResult, ListToolsResult, ServerNotification, ToolListChangedNotification
 
 # Pydantic models for events
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 class ElicitationEvent(BaseModel):
     type: str = "elicitation" # start, elicitation
     content: Any
 
+def encode_event(type: str, content: Any) -> bytes:
+    """
+    Encode a stream event (same shape as ElicitationEvent) as one NDJSON line.
+    Producers encode once, so stream consumers are a pure pass-through.
+    """
+    return orjson.dumps({"type": type, "content": content}) + b"\n"
+
+_RESULT_PREFIX = b'{"type":"result","content":'
+
+def encode_result(content: Any) -> bytes:
+    """
+    Same as encode_event("result", content), but splices the content into a
+    fixed envelope so large tool outputs are serialized exactly once.
+    """
+    return _RESULT_PREFIX + orjson.dumps(content) + b"}\n"
+
+_ELICITATION_PREFIX = b'{"type":"elicitation","content":{"elicitation_type":'
+
+def encode_elicitation(elicitation_type: str, data_json: bytes, state: Optional[str] = None) -> bytes:
+    """
+    Elicitation event whose data is already-serialized JSON (e.g. straight from
+    pydantic-core), spliced in without another decode/encode pass.
+    state is the id the OAuth callback will carry for URL elicitations (None for forms).
+    """
+    return (
+        _ELICITATION_PREFIX + orjson.dumps(elicitation_type)
+        + b',"state":' + orjson.dumps(state)
+        + b',"data":' + data_json + b"}}\n"
+    )
+
+# Per-run event queue bound: a client that stops reading applies backpressure
+# to the producer instead of growing memory without limit.
+EVENT_QUEUE_SIZE = 64
+
+class StreamChannel:
+    """
+    Bounded event channel between one producer (the tool run) and one consumer
+    (the response stream). A deque plus two Events is all a single
+    producer/consumer pair needs, and lets the consumer take every pending
+    item per wake-up.
+    """
+    def __init__(self, maxsize: int = EVENT_QUEUE_SIZE):
+        self._items = collections.deque()
+        self._maxsize = maxsize
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    async def put(self, item: Optional[bytes]) -> None:
+        """
+        Append an item, waiting while the channel is full.
+        """
+        while len(self._items) >= self._maxsize:
+            self._writable.clear()
+            await self._writable.wait()
+        self._items.append(item)
+        self._readable.set()
+
+    def put_final(self, item: Optional[bytes]) -> None:
+        """
+        Append a terminal item (error / end-of-stream) without waiting.
+        If the channel is full the oldest event is dropped, so the consumer
+        always gets the termination signal.
+        """
+        if len(self._items) >= self._maxsize:
+            self._items.popleft()
+        self._items.append(item)
+        self._readable.set()
+
+    async def drain(self) -> List[Optional[bytes]]:
+        """
+        Wait until items are available, then take all of them.
+        """
+        while not self._items:
+            self._readable.clear()
+            await self._readable.wait()
+        items = list(self._items)
+        self._items.clear()
+        self._writable.set()
+        return items
+
+@dataclass
+class SessionState:
+    """
+    Everything the manager tracks for one user session.
+    """
+    # MCP session, set while the connection is up and initialized
+    session: Optional[ClientSession] = None
+    # Event queue of the current tool run
+    # Items are pre-encoded NDJSON lines (see encode_event); None ends the stream.
+    queue: Optional[StreamChannel] = None
+    # Pending UI submission for the current elicitation
+    submission: Optional[asyncio.Future] = None
+
 class MCPClientManager:
     def __init__(self, server_url: str):
         self.server_url = server_url
         
-        # Pool of Sessions: {session_id: ClientSession}
-        self.sessions: Dict[str, ClientSession] = {}
-        
-        # Pool of Event Queues: {session_id: asyncio.Queue}
-        self.event_queues: Dict[str, asyncio.Queue] = {}
-        
-        # Pool of Futures for Submission: {session_id: asyncio.Future}
-        self.submission_futures: Dict[str, asyncio.Future] = {}
+        # Per-session state: {session_id: SessionState}
+        self.states: Dict[str, SessionState] = {}
         
         # Lock to prevent race conditions during connection
         self.connect_lock = asyncio.Lock()
 
+        # In-flight connects: {session_id: Future resolved with the initialized session}
+        # Concurrent first hits for a session share one handshake.
+        self._connecting: Dict[str, asyncio.Future] = {}
+
+        # Connection tasks, referenced so they are neither GC'd nor silently lost
+        self._connection_tasks: Dict[str, asyncio.Task] = {}
+
+        # Negotiated initialize result per server URL (capabilities, server info).
+        # The SDK cannot resume a negotiated session, so every connection still
+        # runs initialize(); the cache lets us skip requests the server cannot
+        # serve. Dropped on connection errors.
+        self._server_init: Dict[str, InitializeResult] = {}
+
+        # Running tool calls: {session_id: asyncio.Task}, so they can be cancelled
+        self._tool_tasks: Dict[str, asyncio.Task] = {}
+
+        # Set by aclose(); releases every connection task's keep-alive wait
+        self._shutdown = asyncio.Event()
+
+        # Hook fired when the server announces notifications/tools/list_changed
+        self.on_tools_changed: Optional[Callable[[], None]] = None
+
+    def _get_state(self, session_id: str) -> SessionState:
+        state = self.states.get(session_id)
+        if state is None:
+            state = self.states[session_id] = SessionState()
+        return state
+
     async def get_or_create_session(self, session_id: str) -> ClientSession:
         """
         Get existing session or create a new one for the user.
         """
+        state = self._get_state(session_id)
         async with self.connect_lock:
-            if session_id in self.sessions:
-                return self.sessions[session_id]
-            
-            # Start background connection for this user
-            # We need to wait for it to be ready
-            ready_event = asyncio.Event()
-            
-            # We must spawn the connection loop properly
-            asyncio.create_task(self._connect_user(session_id, ready_event))
-            
-            await ready_event.wait()
-            return self.sessions[session_id]
+            if state.session is not None:
+                return state.session
 
-    async def _connect_user(self, session_id: str, ready_event: asyncio.Event):
+            ready = self._connecting.get(session_id)
+            if ready is None:
+                # Start background connection for this user
+                ready = self._connecting[session_id] = asyncio.get_running_loop().create_future()
+                self._connection_tasks[session_id] = asyncio.create_task(
+                    self._connect_user(session_id, state, ready)
+                )
+
+        # Wait outside the lock so other users can connect meanwhile;
+        # shield so a cancelled caller does not cancel the shared connect.
+        return await asyncio.shield(ready)
+
+    async def _connect_user(self, session_id: str, state: SessionState, ready: asyncio.Future):
         """
         Background task to maintain SSE connection for a specific user.
         """
-        print(f"DEBUG: Starting new MCP connection for session {session_id}")
+        logger.debug("Starting new MCP connection for session %s", session_id)
         try:
             async with sse_client(self.server_url) as streams:
                 # We need to bind the session_id to the callback
@@ -65,63 +189,85 @@ class MCPClientManager:
                 async with ClientSession(
                     streams[0], 
                     streams[1],
-                    elicitation_callback=bound_callback
+                    elicitation_callback=bound_callback,
+                    message_handler=self._message_handler
                 ) as session:
-                    self.sessions[session_id] = session
-                    await session.initialize()
+                    self._server_init[self.server_url] = await session.initialize()
+                    state.session = session
                     
-                    ready_event.set()
-                    print(f"DEBUG: MCP Session Connected for {session_id}")
+                    ready.set_result(session)
+                    logger.debug("MCP Session Connected for %s", session_id)
                     
-                    # Keep alive
-                    await asyncio.Future()
+                    # Keep alive until shutdown
+                    await self._shutdown.wait()
         except Exception as e:
-            print(f"DEBUG: MCP Connection Error for {session_id}: {e}")
-            traceback.print_exc()
+            logger.exception("MCP Connection Error for %s: %s", session_id, e)
+            self._server_init.pop(self.server_url, None)
+            if not ready.done():
+                ready.set_exception(e)
         finally:
-            print(f"DEBUG: Connection Loop Finished for {session_id}")
+            logger.debug("Connection Loop Finished for %s", session_id)
             # Cleanup
-            if session_id in self.sessions:
-                del self.sessions[session_id]
+            state.session = None
+            if self._connecting.get(session_id) is ready:
+                del self._connecting[session_id]
+                del self._connection_tasks[session_id]
             # Do not delete queue, it belongs to active request
-            ready_event.set() # Unblock if failed
+            if not ready.done(): # Unblock waiters if we never connected
+                ready.set_exception(ConnectionError(f"MCP connection for {session_id} closed"))
+
+    async def aclose(self):
+        """
+        Close all MCP connections. Called on application shutdown.
+        """
+        self._shutdown.set()
+        tasks = list(self._connection_tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _message_handler(self, message):
+        """
+        Callback for server notifications outside of request/response pairs.
+        """
+        if (
+            isinstance(message, ServerNotification)
+            and isinstance(message.root, ToolListChangedNotification)
+            and self.on_tools_changed is not None
+        ):
+            self.on_tools_changed()
 
     async def _elicitation_handler(self, session_id: str, context, params):
         """
         Callback when Server requests elicitation (Form or URL).
         """
-        print(f"DEBUG: Received Elicitation Request for {session_id}: {params}")
+        logger.debug("Received Elicitation Request for %s: %s", session_id, params)
+        state = self._get_state(session_id)
         
         # Create a future to wait for UI submission SPECIFIC TO THIS SESSION
-        self.submission_futures[session_id] = asyncio.Future()
+        submission = state.submission = asyncio.get_running_loop().create_future()
         
         # Construct event payload
         try:
             elicitation_type = params.mode # "form" or "url"
-            data = params.model_dump(mode='json')
+            # Rust-side JSON bytes; same fields as model_dump(mode='json')
+            data_json = params.__pydantic_serializer__.to_json(params, by_alias=False)
             
-            event = ElicitationEvent(
-                type="elicitation",
-                content={
-                    "elicitation_type": elicitation_type,
-                    "data": data
-                }
-            )
+            event = encode_elicitation(elicitation_type, data_json, getattr(params, "elicitationId", None))
             
             # Put on queue for this user
-            if session_id in self.event_queues:
-                print(f"DEBUG: Putting Elicitation Event on queue for {session_id}")
-                await self.event_queues[session_id].put(event)
+            if state.queue is not None:
+                logger.debug("Putting Elicitation Event on queue for %s", session_id)
+                await state.queue.put(event)
             else:
-                 print(f"ERROR: No event queue for {session_id}")
+                 logger.error("No event queue for %s", session_id)
                  return # Should raise error
             
             # Wait for future
-            result_data = await self.submission_futures[session_id]
+            result_data = await submission
             
             # Cleanup future
-            if session_id in self.submission_futures:
-                del self.submission_futures[session_id]
+            if state.submission is submission:
+                state.submission = None
 
             # Prepare Response
             if elicitation_type == "url":
@@ -129,7 +275,7 @@ class MCPClientManager:
             else:
                  return ElicitResult(action="accept", content=result_data)
         except Exception as e:
-             traceback.print_exc()
+             logger.exception("Elicitation handler failed for %s", session_id)
              raise e
 
     def start_tool_task(self, session_id: str, tool_name: str, arguments: Dict[str, Any]):
@@ -139,7 +285,8 @@ class MCPClientManager:
         """
         # 1. FORCE reset queue for new run immediately (Synchronous)
         # This guarantees attach_to_running_task finds it.
-        self.event_queues[session_id] = asyncio.Queue()
+        state = self._get_state(session_id)
+        queue = state.queue = StreamChannel()
         
         async def wrapped_call():
             try:
@@ -149,78 +296,112 @@ class MCPClientManager:
                     session = await self.get_or_create_session(session_id)
                 except Exception as e:
                     error_msg = f"Failed to get/create session for {session_id}: {e}"
-                    print(f"DEBUG: {error_msg}")
-                    if session_id in self.event_queues:
-                         await self.event_queues[session_id].put(ElicitationEvent(
-                            type="error",
-                            content=error_msg
-                        ))
+                    logger.debug(error_msg)
+                    queue.put_final(encode_event("error", error_msg))
                     return # Stop here
 
-                print(f"DEBUG: calling tool {tool_name} for {session_id}...")
-                result = await session.call_tool(tool_name, arguments)
-                print(f"DEBUG: tool {tool_name} returned for {session_id}: {result}")
+                logger.debug("calling tool %s for %s...", tool_name, session_id)
+                # Shielded: cancelling the run must not abort an in-flight MCP request
+                # on the shared session; cancellation takes effect once it returns.
+                result = await asyncio.shield(session.call_tool(tool_name, arguments))
+                logger.debug("tool %s returned for %s: %s", tool_name, session_id, result)
                 
-                # Check if queue still exists (might have been cleaned up if session died)
-                if session_id in self.event_queues:
-                    await self.event_queues[session_id].put(ElicitationEvent(
-                        type="result",
-                        content=str(result.content[0].text) if result.content else "No content"
-                    ))
+                await queue.put(encode_result(
+                    result.content[0].text if result.content else "No content"
+                ))
             except Exception as e:
-                import traceback
                 error_msg = f"Error executing tool {tool_name}: {e}\n{traceback.format_exc()}"
-                print(error_msg)
-                if session_id in self.event_queues:
-                    await self.event_queues[session_id].put(ElicitationEvent(
-                        type="error",
-                        content=error_msg
-                    ))
+                logger.error(error_msg)
+                queue.put_final(encode_event("error", error_msg))
             finally:
+                # A pending elicitation cannot outlive its run: fail it so the
+                # MCP request is answered instead of waiting forever.
+                if state.submission is not None and not state.submission.done():
+                    state.submission.set_exception(ConnectionError(f"Tool run for {session_id} ended"))
                 # Signal stream end
-                if session_id in self.event_queues:
-                    await self.event_queues[session_id].put(None)
+                queue.put_final(None)
+
+        task = self._tool_tasks[session_id] = asyncio.create_task(wrapped_call())
+        task.add_done_callback(lambda t: self._forget_tool_task(session_id, t))
 
-        # Fire and forget task
-        asyncio.create_task(wrapped_call())
+    def _forget_tool_task(self, session_id: str, task: asyncio.Task):
+        if self._tool_tasks.get(session_id) is task:
+            del self._tool_tasks[session_id]
+
+    def _detach(self, session_id: str, state: SessionState):
+        """
+        The stream consumer went away before the end of the run.
+        Leaving while an elicitation is pending is the normal v2 flow (the UI
+        resumes via /submit_elicitation), so only runs that are not waiting
+        for the user are cancelled.
+        """
+        if state.submission is not None and not state.submission.done():
+            return
+        task = self._tool_tasks.get(session_id)
+        if task is not None and not task.done():
+            logger.debug("Client disconnected, cancelling tool run for %s", session_id)
+            task.cancel()
 
     async def attach_to_running_task(self, session_id: str):
         """
-        Generator for StreamingResponse.
+        Yields the pre-encoded NDJSON lines of a running task.
         """
-        if session_id not in self.event_queues:
+        state = self.states.get(session_id)
+        if state is None or state.queue is None:
              # If no queue, maybe session died or never started
-             yield json.dumps({"type": "error", "content": "Session not found"}) + "\n"
+             yield encode_event("error", "Session not found")
              return
 
-        print(f"DEBUG: attach_to_running_task started for {session_id}")
-        queue = self.event_queues[session_id]
-        while True:
-            event = await queue.get()
-            if event is None:
-                print(f"DEBUG: attach_to_running_task finished for {session_id} (None event)")
-                break
-            print(f"DEBUG: attach_to_running_task yielding event for {session_id}: {event.type}")
-            yield json.dumps(event.model_dump()) + "\n"
+        logger.debug("attach_to_running_task started for %s", session_id)
+        queue = state.queue
+        finished = False
+        try:
+            while not finished:
+                for payload in await queue.drain():
+                    if payload is None:
+                        finished = True
+                        break
+                    logger.debug("attach_to_running_task yielding event for %s", session_id)
+                    yield payload
+            logger.debug("attach_to_running_task finished for %s (None event)", session_id)
+        finally:
+            # Client disconnect: cancellation / generator close before end-of-stream
+            if not finished:
+                self._detach(session_id, state)
 
     async def submit_response(self, session_id: str, response_data: Dict[str, Any]):
         """
         Called by UI to submit form data.
         """
-        if session_id in self.submission_futures:
-            future = self.submission_futures[session_id]
+        state = self.states.get(session_id)
+        future = state.submission if state is not None else None
+        if future is not None:
             if not future.done():
                 future.set_result(response_data)
             else:
-                print(f"WARNING: Future for {session_id} already done.")
+                logger.warning("Future for %s already done.", session_id)
         else:
-            print(f"WARNING: No active elicitation to submit to for {session_id}.")
+            logger.warning("No active elicitation to submit to for %s.", session_id)
+
+    @asynccontextmanager
+    async def _transient_session(self):
+        """
+        Short-lived MCP session for one-off requests, closed on exit.
+        """
+        async with sse_client(self.server_url) as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                self._server_init[self.server_url] = await session.initialize()
+                yield session
 
     async def list_tools(self):
         """
-        List available tools. Uses a temporary or default session.
-        For POC we just create a temp session or use a 'system' session.
+        List available tools over a transient session.
+        The /tools TTL cache keeps this to one handshake per TTL window,
+        so no connection is held open just for tool listing.
         """
-        # We can use a 'system' session for tool listing
-        session = await self.get_or_create_session("system_tool_lister")
-        return await session.list_tools()
+        init = self._server_init.get(self.server_url)
+        if init is not None and init.capabilities.tools is None:
+            # Server negotiated no tools capability: nothing to list
+            return ListToolsResult(tools=[])
+        async with self._transient_session() as session:
+            return await session.list_tools()
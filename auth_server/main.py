@@ -4,16 +4,14 @@ Simple Auth Server simulating an OAuth provider.
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 import uvicorn
-import uuid
+import secrets
+import html
+from urllib.parse import urlencode
 
 app = FastAPI(title="Auth Server POC")
 
-@app.get("/auth", response_class=HTMLResponse)
-async def auth_page(state: str, callback: str):
-    """
-    Renders a simple login/approval page.
-    """
-    return f"""
+# Login page, built once at import. Only state/callback vary per request.
+AUTH_PAGE_TMPL = """
     <html>
         <head>
             <title>Login - Auth Server</title>
@@ -40,6 +38,17 @@ async def auth_page(state: str, callback: str):
     </html>
     """
 
+@app.get("/auth", response_class=HTMLResponse)
+async def auth_page(state: str, callback: str):
+    """
+    Renders a simple login/approval page.
+    """
+    # Escape query values: they are echoed into HTML attributes
+    return AUTH_PAGE_TMPL.format(
+        state=html.escape(state, quote=True),
+        callback=html.escape(callback, quote=True)
+    )
+
 @app.post("/approve")
 async def approve_auth(request: Request):
     """
@@ -50,10 +59,10 @@ async def approve_auth(request: Request):
     callback = form_data.get("callback")
     
     # Generate a mock auth code
-    code = f"AUTH-CODE-{uuid.uuid4().hex[:12].upper()}"
+    code = "AUTH-CODE-" + secrets.token_hex(6).upper()
     
-    # Redirect back to the callback URL with code and state
-    redirect_url = f"{callback}?code={code}&state={state}"
+    # Redirect back to the callback URL with code and state (query-encoded)
+    redirect_url = callback + "?" + urlencode({"code": code, "state": state})
     
     return RedirectResponse(url=redirect_url, status_code=303)
 
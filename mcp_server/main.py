@@ -2,14 +2,26 @@
 MCP Server using the official MCP SDK (FastMCP).
 """
 from typing import Any, Dict, List, Optional
+import asyncio
+import functools
 import uuid
-import json
+import secrets
+import orjson
 from mcp.server.fastmcp import FastMCP, Context
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from starlette.requests import Request
-from starlette.responses import Response
-import traceback
-import sys
+from starlette.responses import RedirectResponse, Response
+from starlette.staticfiles import StaticFiles
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _dumps(obj: Any) -> str:
+    """
+    JSON-encode a tool payload (tools return str, orjson returns bytes).
+    """
+    return orjson.dumps(obj).decode()
 
 # Initialize FastMCP Server
 mcp = FastMCP("MCP Server POC", host="0.0.0.0")
@@ -17,6 +29,43 @@ mcp = FastMCP("MCP Server POC", host="0.0.0.0")
 # In-memory storage for POC context
 sessions = {}
 
+# Elicitation models for the v2 tools
+class TicketDetails(BaseModel):
+    reporter_name: str
+    priority: str
+    description: str
+
+class NameModel(BaseModel):
+    name: str
+
+class DateModel(BaseModel):
+    date: str
+
+@functools.cache
+def _schema_for(model: type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema for an elicitation model, generated on first use and memoized.
+    """
+    return model.model_json_schema()
+
+# Reused validators for the elicitation replies
+_TICKET_ADAPTER = TypeAdapter(TicketDetails)
+_NAME_ADAPTER = TypeAdapter(NameModel)
+_DATE_ADAPTER = TypeAdapter(DateModel)
+
+def _warmup() -> None:
+    """
+    Build the elicitation schemas and exercise the validators before serving,
+    so the first v2 tool call doesn't pay for them.
+    """
+    for model in (TicketDetails, NameModel, DateModel):
+        _schema_for(model)
+    _TICKET_ADAPTER.validate_python({"reporter_name": "x", "priority": "low", "description": "x"})
+    _NAME_ADAPTER.validate_python({"name": "x"})
+    _DATE_ADAPTER.validate_python({"date": "x"})
+
+_DEBUG_SCHEMA = {"type": "object", "properties": {"foo": {"type": "string"}}}
+
 # Tool Definitions using Decorators
 
 @mcp.tool()
@@ -26,6 +75,43 @@ async def simple_tool(message: str) -> str:
     """
     return f"Processed: {message}"
 
+# v1 create_ticket elicitation payload. Only initial_description varies per call,
+# so the JSON around that slot is rendered once and the value is spliced in.
+_INITIAL_DESCRIPTION_SLOT = "__initial_description__"
+_PRIORITY_LEVELS = ("low", "medium", "high")
+_TICKET_ELICITATION_TEMPLATE = {
+    "type": "elicitation",
+    "elicitation_type": "form",
+    "message": "Please provide ticket details",
+    "fields": [
+        {
+            "name": "reporter_name",
+            "description": "Name of the reporter",
+            "type": "string",
+            "required": True
+        },
+        {
+            "name": "priority",
+            "description": "Priority level",
+            "type": "string",
+            "enum": _PRIORITY_LEVELS,
+            "required": True
+        },
+        {
+            "name": "description",
+            "description": "Detailed description",
+            "type": "string",
+            "required": True
+        }
+    ],
+    "context_data": {
+        "initial_description": _INITIAL_DESCRIPTION_SLOT
+    }
+}
+_TICKET_ELICITATION_JSON_PREFIX, _TICKET_ELICITATION_JSON_SUFFIX = _dumps(
+    _TICKET_ELICITATION_TEMPLATE
+).split(_dumps(_INITIAL_DESCRIPTION_SLOT))
+
 @mcp.tool()
 async def create_ticket(
     initial_description: str,
@@ -38,44 +124,28 @@ async def create_ticket(
     Create a new support ticket (v1).
     """
     if reporter_name and priority and description:
-        ticket_id = f"TICKET-{uuid.uuid4().hex[:8].upper()}"
-        return json.dumps({
+        ticket_id = f"TICKET-{secrets.token_hex(4).upper()}"
+        return _dumps({
             "type": "result",
             "text": f"Ticket created successfully!\nID: {ticket_id}\nReporter: {reporter_name}\nPriority: {priority}\nDescription: {description}"
         })
     
-    elicitation_req = {
-        "type": "elicitation",
-        "elicitation_type": "form",
-        "message": "Please provide ticket details",
-        "fields": [
-            {
-                "name": "reporter_name",
-                "description": "Name of the reporter",
-                "type": "string",
-                "required": True
-            },
-            {
-                "name": "priority",
-                "description": "Priority level",
-                "type": "string",
-                "enum": ["low", "medium", "high"],
-                "required": True
-            },
-            {
-                "name": "description",
-                "description": "Detailed description",
-                "type": "string",
-                "required": True
-            }
-        ],
-        "context_data": {
-            "initial_description": initial_description
-        }
-    }
-    return json.dumps(elicitation_req)
+    return _TICKET_ELICITATION_JSON_PREFIX + _dumps(initial_description) + _TICKET_ELICITATION_JSON_SUFFIX
+
+# OAuth state -> future resolved with the auth code by oauth_callback
+auth_store: Dict[str, asyncio.Future] = {}
+# Static assets (the OAuth success page), mounted on the SSE app below
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# The success page never changes, so browsers may keep it for a day
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+# How long a login waits for the callback before giving up (seconds)
+AUTH_TIMEOUT = 300
 
-auth_store = {}
+def _auth_future(state: str) -> asyncio.Future:
+    fut = auth_store.get(state)
+    if fut is None:
+        fut = auth_store[state] = asyncio.get_running_loop().create_future()
+    return fut
 
 @mcp.custom_route("/oauth/callback", methods=["GET"])
 async def oauth_callback(request: Request):
@@ -84,8 +154,11 @@ async def oauth_callback(request: Request):
     state = query_params.get("state")
     
     if code and state:
-        auth_store[state] = code
-        return Response(content="<html><body><h1>Authentication Successful</h1><p>You can close this tab and return to the chat.</p></body></html>", media_type="text/html")
+        # Left in the store so a v1 resubmission arriving later still finds it
+        fut = _auth_future(state)
+        if not fut.done():
+            fut.set_result(code)
+        return RedirectResponse("/static/oauth_success.html", status_code=303)
     return Response(content="Missing code or state", status_code=400)
 
 @mcp.tool()
@@ -97,20 +170,20 @@ async def oauth_auth(
     Authenticate via OAuth (v1).
     """
     if auth_code:
-        return json.dumps({
+        return _dumps({
             "type": "result",
             "text": "Authentication successful! You have been logged in."
         })
 
     if state:
-        if state in auth_store:
-            code = auth_store.pop(state)
-            return json.dumps({
+        fut = auth_store.pop(state, None)
+        if fut is not None and fut.done():
+            return _dumps({
                 "type": "result",
                 "text": "Authentication successful! You have been logged in."
             })
         else:
-            return json.dumps({
+            return _dumps({
                 "type": "result",
                 "text": "Authentication failed: We could not verify your login details. Please try again."
             })
@@ -129,7 +202,7 @@ async def oauth_auth(
             "state": oauth_state
         }
     }
-    return json.dumps(elicitation_req)
+    return _dumps(elicitation_req)
 
 # --- v2 Tools (Server-Driven Elicitation) ---
 
@@ -138,53 +211,53 @@ async def create_ticket_v2(ctx: Context, initial_description: str) -> str:
     """
     Create a ticket (v2) using Server-Driven Elicitation (Form).
     """
-    print(f"DEBUG: create_ticket_v2 called with {initial_description}")
+    logger.debug("create_ticket_v2 called with %s", initial_description)
     try:
-        class TicketDetails(BaseModel):
-            reporter_name: str
-            priority: str
-            description: str
-
         # Elicit!
-        # Pass .model_json_schema() instead of class
-        print(f"DEBUG: Calling elicit_form with schema: {TicketDetails.model_json_schema()}")
+        # Pass the JSON schema instead of class
+        logger.debug("Calling elicit_form with schema: %s", _schema_for(TicketDetails))
         result = await ctx.session.elicit_form(
             "Please provide additional ticket details for v2.",
-            requestedSchema=TicketDetails.model_json_schema()
+            requestedSchema=_schema_for(TicketDetails)
         )
-        print(f"DEBUG: elicit_form result received: {result}")
+        logger.debug("elicit_form result received: %s", result)
 
         # result.content (not data) matches schema
         data = result.content
         if not data:
              raise ValueError("No data returned from elicitation")
              
-        model_data = TicketDetails(**data)
+        model_data = _TICKET_ADAPTER.validate_python(data)
         
-        ticket_id = f"TICKET-V2-{uuid.uuid4().hex[:8].upper()}"
+        ticket_id = f"TICKET-V2-{secrets.token_hex(4).upper()}"
         return f"Ticket created! ID: {ticket_id}, Reporter: {model_data.reporter_name}, Priority: {model_data.priority}, Description: {model_data.description}"
-    except Exception as e:
-        print(f"ERROR: Exception in create_ticket_v2: {e}")
-        traceback.print_exc()
-        raise e
+    except Exception:
+        logger.exception("create_ticket_v2 failed")
+        raise
 
 @mcp.tool()
 async def login_v2(ctx: Context) -> str:
     """
     Login (v2) using Server-Driven Elicitation (URL).
     """
-    session_id = uuid.uuid4().hex
+    session_id = secrets.token_hex(16)
     callback_url = "http://localhost:8001/oauth/callback"
     auth_url = f"http://localhost:8002/auth?state={session_id}&callback={callback_url}"
     
-    result = await ctx.session.elicit_url(
+    fut = _auth_future(session_id)
+    elicit = asyncio.create_task(ctx.session.elicit_url(
         "Please authenticate to continue (v2 flow).",
         url=auth_url,
         elicitation_id=session_id
-    )
-    
-    if session_id in auth_store:
-        code = auth_store.pop(session_id)
+    ))
+    try:
+        # Whichever lands first: the OAuth callback or the client's elicitation reply
+        await asyncio.wait({fut, elicit}, timeout=AUTH_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        elicit.cancel()
+        auth_store.pop(session_id, None)
+
+    if fut.done():
         return "Authentication successful (v2)! You have been logged in."
     else:
         return "Authentication failed (v2): We could not verify your login details."
@@ -194,18 +267,12 @@ async def book_appointment_v2(ctx: Context) -> str:
     """
     Book appointment using multiple elicitation steps.
     """
-    class NameModel(BaseModel):
-        name: str
-        
-    name_result = await ctx.session.elicit_form("What is the patient's name?", requestedSchema=NameModel.model_json_schema())
-    name_data = NameModel(**name_result.content)
+    name_result = await ctx.session.elicit_form("What is the patient's name?", requestedSchema=_schema_for(NameModel))
+    name_data = _NAME_ADAPTER.validate_python(name_result.content)
     name = name_data.name
     
-    class DateModel(BaseModel):
-        date: str
-        
-    date_result = await ctx.session.elicit_form(f"Thanks {name}. What date would you like to book?", requestedSchema=DateModel.model_json_schema())
-    date_data = DateModel(**date_result.content)
+    date_result = await ctx.session.elicit_form(f"Thanks {name}. What date would you like to book?", requestedSchema=_schema_for(DateModel))
+    date_data = _DATE_ADAPTER.validate_python(date_result.content)
     date = date_data.date
     
     return f"Appointment booked for {name} on {date}!"
@@ -215,21 +282,36 @@ async def debug_elicitation(ctx: Context) -> str:
     """
     Simple debug tool for elicitation.
     """
-    print("DEBUG: debug_elicitation called", file=sys.stderr)
+    logger.debug("debug_elicitation called")
     try:
         result = await ctx.session.elicit_form(
             "Debug Prompt",
-            requestedSchema={"type": "object", "properties": {"foo": {"type": "string"}}}
+            requestedSchema=_DEBUG_SCHEMA
         )
-        print(f"DEBUG: result={result}", file=sys.stderr)
+        logger.debug("result=%s", result)
         # Use result.content
         return f"Debug Result: {result.content.get('foo') if result.content else 'None'}"
-    except Exception as e:
-        import traceback
-        traceback.print_exc(file=sys.stderr)
-        raise e
+    except Exception:
+        logger.exception("debug_elicitation failed")
+        raise
+
+class _CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that also sends a long Cache-Control with every file.
+    """
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("cache-control", STATIC_CACHE_CONTROL)
+        return response
+
+# The ASGI app: MCP SSE endpoints, custom routes and the static success page
+app = mcp.sse_app()
+app.mount("/static", _CachedStaticFiles(directory=STATIC_DIR), name="static")
 
 if __name__ == "__main__":
     import uvicorn
-    # Enable access log
-    uvicorn.run(mcp.sse_app(), host="0.0.0.0", port=8001, access_log=True)
+    # DEBUG tracing stays off unless explicitly enabled
+    logging.basicConfig(level=logging.INFO)
+    _warmup()
+    # No per-request access log; "auto" runs on uvloop wherever it is installed
+    uvicorn.run(app, host="0.0.0.0", port=8001, loop="auto", access_log=False, log_level="warning")
@@ -1,12 +1,16 @@
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 import sys
 import time
 
 API_URL = "http://localhost:8000"
 
-def test_legacy_login():
+# One client for the whole script: keep-alive connections are pooled per host
+CLIENT = httpx.AsyncClient(timeout=None)
+
+async def test_legacy_login():
     print("Testing 'login v1' Legacy Flow (URL)...")
     session_id = "test-legacy-login-1"
     
@@ -15,16 +19,16 @@ def test_legacy_login():
     elicitation_data = None
     
     try:
-        with requests.post(
+        async with CLIENT.stream(
+            "POST",
             f"{API_URL}/chat", 
-            json={"message": "login", "user_id": "verifier", "session_id": session_id},
-            stream=True
+            json={"message": "login", "user_id": "verifier", "session_id": session_id}
         ) as r:
-            for line in r.iter_lines():
+            async for line in r.aiter_lines():
                 if line:
-                    event = json.loads(line)
+                    event = orjson.loads(line)
                     print(f"   Received: {event}")
-                    
+                
                     if event.get("type") == "elicitation":
                         content = event.get("content", {})
                         data = content.get("data", {})
@@ -60,14 +64,14 @@ def test_legacy_login():
     success = False
     
     try:
-        with requests.post(
+        async with CLIENT.stream(
+            "POST",
             f"{API_URL}/submit_elicitation",
-            json=submission,
-            stream=True
+            json=submission
         ) as r:
-            for line in r.iter_lines():
+            async for line in r.aiter_lines():
                 if line:
-                    event = json.loads(line)
+                    event = orjson.loads(line)
                     print(f"   Received: {event}")
                     if event.get("type") == "result":
                          content = event.get("content", "")
@@ -75,7 +79,7 @@ def test_legacy_login():
                              print("   SUCCESS: Login completed via legacy flow")
                              success = True
                              break
-                             
+                         
     except Exception as e:
         print(f"   FAILED: {e}")
         sys.exit(1)
@@ -85,4 +89,4 @@ def test_legacy_login():
          sys.exit(1)
 
 if __name__ == "__main__":
-    test_legacy_login()
+    asyncio.run(test_legacy_login())
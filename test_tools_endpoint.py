@@ -4,10 +4,13 @@ import sys
 
 API_URL = "http://localhost:8000"
 
+# Shared session: keep-alive connections are pooled per host
+SESSION = requests.Session()
+
 def test_tools_endpoint():
     print("Testing GET /tools endpoint...")
     try:
-        resp = requests.get(f"{API_URL}/tools")
+        resp = SESSION.get(f"{API_URL}/tools")
         print(f"Status Code: {resp.status_code}")
         if resp.status_code == 200:
             data = resp.json()
@@ -1,12 +1,16 @@
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 import sys
 import time
 
 API_URL = "http://localhost:8000"
 
-def test_v2_login_verification():
+# One client for the whole script: keep-alive connections are pooled per host
+CLIENT = httpx.AsyncClient(timeout=None)
+
+async def test_v2_login_verification():
     print("Testing 'login v2' Verification Flow...")
     session_id = "test-v2-login-verify"
     
@@ -15,16 +19,16 @@ def test_v2_login_verification():
     elicitation_received = False
     
     try:
-        with requests.post(
+        async with CLIENT.stream(
+            "POST",
             f"{API_URL}/chat", 
-            json={"message": "login v2", "user_id": "verifier", "session_id": session_id},
-            stream=True
+            json={"message": "login v2", "user_id": "verifier", "session_id": session_id}
         ) as r:
-            for line in r.iter_lines():
+            async for line in r.aiter_lines():
                 if line:
-                    event = json.loads(line)
+                    event = orjson.loads(line)
                     print(f"   Received: {event}")
-                    
+                
                     if event.get("type") == "elicitation":
                         # v2 elicitation is type=elicitation, content={elicitation_type: url, ...}
                         content = event.get("content", {})
@@ -53,14 +57,14 @@ def test_v2_login_verification():
     success = False
     
     try:
-        with requests.post(
+        async with CLIENT.stream(
+            "POST",
             f"{API_URL}/submit_elicitation",
-            json=submission,
-            stream=True
+            json=submission
         ) as r:
-            for line in r.iter_lines():
+            async for line in r.aiter_lines():
                 if line:
-                    event = json.loads(line)
+                    event = orjson.loads(line)
                     print(f"   Received: {event}")
                     if event.get("type") == "result":
                          content = event.get("content", "")
@@ -72,7 +76,7 @@ def test_v2_login_verification():
                          elif "successful" in content:
                              print("   FAILED: Received success message but shoud have failed!")
                              sys.exit(1)
-                             
+                         
     except Exception as e:
         print(f"   FAILED: {e}")
         sys.exit(1)
@@ -82,4 +86,4 @@ def test_v2_login_verification():
          sys.exit(1)
 
 if __name__ == "__main__":
-    test_v2_login_verification()
+    asyncio.run(test_v2_login_verification())
@@ -0,0 +1,17 @@
+import pytest
+from fastapi.testclient import TestClient
+
+# mcp.sse_app() with the static OAuth success page mounted
+from mcp_server.main import app as mcp_app
+from assistant_backend.main import app as assistant_app
+
+# App startup runs once per test session (once per xdist worker), not once per test
+@pytest.fixture(scope="session")
+def mcp_client():
+    with TestClient(mcp_app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def assistant_client():
+    with TestClient(assistant_app) as client:
+        yield client
@@ -0,0 +1,36 @@
+import pytest
+
+from assistant_backend.main import detect_intent, ROUTES, INTENT_KEYWORDS
+
+@pytest.mark.parametrize("message, intent", [
+    ("ticket v2 printer broken", "ticket v2"),
+    # "ticket v2" wins over its prefix "ticket", wherever each occurs
+    ("ticket about the printer, ticket v2 please", "ticket v2"),
+    ("tickt v2", "tickt v2"),
+    ("login v2", "login v2"),
+    ("book v2", "book v2"),
+    # v2 keywords outrank the v1 fallbacks
+    ("login and book v2 appointment", "book v2"),
+    ("appointment after my ticket", "appointment"),
+    ("create ticket for broken printer", "ticket"),
+    ("please login, then debug", "login"),
+    ("debug elicitation", "debug"),
+    ("hello", None),
+])
+def test_detect_intent_priority(message, intent):
+    assert detect_intent(message) == intent
+
+def test_every_intent_has_a_route():
+    assert set(ROUTES) == set(INTENT_KEYWORDS)
+
+@pytest.mark.parametrize("message, expected", [
+    ("ticket v2 printer", ("create_ticket_v2", {"initial_description": "ticket v2 printer"})),
+    ("login v2", ("login_v2", {})),
+    ("appointment", ("book_appointment_v2", {})),
+    ("ticket for the printer", ("create_ticket", {"initial_description": "ticket for the printer"})),
+    ("ticket", ("create_ticket", {"initial_description": "No desc"})),
+    ("login", ("oauth_auth", {})),
+    ("debug", ("debug_elicitation", {})),
+])
+def test_routes(message, expected):
+    assert ROUTES[detect_intent(message)](message) == expected
@@ -0,0 +1,50 @@
+import asyncio
+
+from assistant_backend.mcp_client_gen import StreamChannel
+
+def test_drain_takes_every_pending_item():
+    async def run():
+        channel = StreamChannel(maxsize=4)
+        await channel.put(b"a")
+        await channel.put(b"b")
+        channel.put_final(None)
+        return await channel.drain()
+
+    assert asyncio.run(run()) == [b"a", b"b", None]
+
+def test_drain_waits_for_a_producer():
+    async def run():
+        channel = StreamChannel(maxsize=4)
+        consumer = asyncio.create_task(channel.drain())
+        await asyncio.sleep(0)
+        assert not consumer.done()
+        await channel.put(b"a")
+        return await asyncio.wait_for(consumer, 1)
+
+    assert asyncio.run(run()) == [b"a"]
+
+def test_put_blocks_while_full_until_drained():
+    async def run():
+        channel = StreamChannel(maxsize=2)
+        await channel.put(b"a")
+        await channel.put(b"b")
+        producer = asyncio.create_task(channel.put(b"c"))
+        await asyncio.sleep(0)
+        # Backpressure: the third put waits for the consumer
+        assert not producer.done()
+        first = await channel.drain()
+        await asyncio.wait_for(producer, 1)
+        return first, await channel.drain()
+
+    assert asyncio.run(run()) == ([b"a", b"b"], [b"c"])
+
+def test_put_final_drops_oldest_when_full():
+    async def run():
+        channel = StreamChannel(maxsize=2)
+        await channel.put(b"a")
+        await channel.put(b"b")
+        # Never waits, and the end-of-stream marker always gets through
+        channel.put_final(None)
+        return await channel.drain()
+
+    assert asyncio.run(run()) == [b"b", None]
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from mcp.types import CallToolResult, ElicitRequestFormParams, TextContent
+
+from assistant_backend.mcp_client_gen import MCPClientManager
+
+FORM = ElicitRequestFormParams(message="Details?", requestedSchema={"type": "object", "properties": {}})
+
+class FakeSession:
+    """
+    Stands in for a connected ClientSession: each call_tool waits until the
+    test releases it by name.
+    """
+    def __init__(self):
+        self.release = {}
+
+    async def call_tool(self, name, arguments):
+        release = self.release[name] = asyncio.Event()
+        await release.wait()
+        return CallToolResult(content=[TextContent(type="text", text=name)])
+
+def test_replaced_run_does_not_fail_the_new_runs_elicitation():
+    async def run():
+        manager = MCPClientManager("http://unused")
+        session = manager._get_state("S").session = FakeSession()
+
+        manager.start_tool_task("S", "a", {})
+        await asyncio.sleep(0)
+        elicit_a = asyncio.create_task(manager._elicitation_handler("S", None, FORM))
+        await asyncio.sleep(0)
+
+        manager.start_tool_task("S", "b", {})
+        with pytest.raises(ConnectionError):
+            await elicit_a
+        await asyncio.sleep(0)
+        elicit_b = asyncio.create_task(manager._elicitation_handler("S", None, FORM))
+        await asyncio.sleep(0)
+
+        # Run a's shielded call finishing late must leave run b's form pending
+        session.release["a"].set()
+        await asyncio.sleep(0.01)
+        assert not elicit_b.done()
+
+        await manager.submit_response("S", {"ok": True})
+        result = await asyncio.wait_for(elicit_b, 1)
+        session.release["b"].set()
+        await asyncio.wait_for(manager._tool_tasks["S"], 1)
+        return result
+
+    assert asyncio.run(run()).content == {"ok": True}
@@ -0,0 +1,74 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from assistant_backend.mcp_client import MCPClientManager
+
+# Mock Result Object from MCP SDK
+class MockTextContent:
+    def __init__(self, text):
+        self.text = text
+
+class MockToolResult:
+    def __init__(self, text):
+        self.content = [MockTextContent(text)]
+
+# Tool results, built once at import and shared by the cases below
+_SIMPLE_RESULT = MockToolResult("Processed: hello")
+_ELICITATION_RESULT = MockToolResult(json.dumps({
+    "type": "elicitation",
+    "elicitation_type": "form",
+    "message": "Fill form",
+    "fields": []
+}))
+_TICKET_RESULT = MockToolResult(json.dumps({
+    "type": "result",
+    "text": "Ticket Created"
+}))
+
+# One legacy (v1) manager mock for the module, reset before each test
+_MCP_MANAGER = AsyncMock()
+
+@pytest.fixture
+def mcp_mock(monkeypatch):
+    _MCP_MANAGER.reset_mock()
+    monkeypatch.setattr("assistant_backend.main.legacy_manager", _MCP_MANAGER)
+    yield _MCP_MANAGER
+
+# The three flows share one shape: the mocked tool returns a canned result,
+# and the endpoint's response is checked against it.
+@pytest.mark.parametrize("path, body, tool_result, expected_type, check_content", [
+    pytest.param(
+        "/chat",
+        {"message": "hello", "user_id": "test"},
+        _SIMPLE_RESULT,
+        "result",
+        lambda content: content == "Processed: hello",
+        id="simple_tool_flow",
+    ),
+    pytest.param(
+        "/chat",
+        {"message": "create ticket", "user_id": "test"},
+        _ELICITATION_RESULT,
+        "elicitation",
+        lambda content: content["elicitation_type"] == "form",
+        id="create_ticket_elicitation",
+    ),
+    pytest.param(
+        "/submit_elicitation",
+        {"session_id": "123", "response_data": {"reporter_name": "Test"}, "is_v1": True, "tool_name": "create_ticket"},
+        _TICKET_RESULT,
+        "result",
+        # v1 results are passed through as the tool's JSON text
+        lambda content: json.loads(content)["text"] == "Ticket Created",
+        id="submit_elicitation",
+    ),
+])
+def test_flow(assistant_client, mcp_mock, path, body, tool_result, expected_type, check_content):
+    mcp_mock.call_tool.return_value = tool_result
+
+    response = assistant_client.post(path, json=body)
+    data = response.json()
+
+    assert data["type"] == expected_type
+    assert check_content(data["content"])
@@ -1,12 +1,36 @@
 import streamlit as st
-import requests
+import httpx
 import uuid
 import os
-import json
+import time
+import orjson
 
 # Configuration
 ASSISTANT_API_URL = os.getenv("ASSISTANT_API_URL", "http://localhost:8000")
 API_URL = ASSISTANT_API_URL # Alias
+# Minimum seconds between streamed markdown re-renders
+RENDER_INTERVAL = 0.05
+# Most inputs placed side by side in one elicitation form row
+FORM_COLUMNS = 3
+# Chat messages drawn in full on each rerun
+HISTORY_LIMIT = int(os.getenv("HISTORY_LIMIT", "50"))
+
+@st.cache_resource
+def _client() -> httpx.Client:
+    """
+    One pooled HTTP client shared across reruns, so each call reuses a
+    connection to the backend (multiplexed when the backend speaks HTTP/2).
+    """
+    return httpx.Client(http2=True, base_url=API_URL, timeout=None)
+
+@st.cache_data(ttl=60, show_spinner="Fetching tools...")
+def fetch_tools(api_url: str) -> dict:
+    """
+    The backend's /tools listing, shared by all sessions for up to a minute.
+    """
+    resp = _client().get(f"{api_url}/tools")
+    resp.raise_for_status()
+    return resp.json()
 
 st.set_page_config(page_title="AI Assistant v2", page_icon="🤖")
 st.title("AI Assistant - Server Driven Elicitation")
@@ -19,6 +43,8 @@ if "elicitation_active" not in st.session_state:
     st.session_state.elicitation_active = False
 if "elicitation_data" not in st.session_state:
     st.session_state.elicitation_data = None
+if "elicitation_fields" not in st.session_state:
+    st.session_state.elicitation_fields = ()
 
 # Sidebar
 with st.sidebar:
@@ -26,21 +52,17 @@ with st.sidebar:
     st.write(f"**Backend API:** `{API_URL}`")
     
     if st.button("Refresh Tools"):
-        st.session_state.pop("tools_info", None)
+        fetch_tools.clear()
         
-    if "tools_info" not in st.session_state:
-        try:
-            with st.spinner("Fetching tools..."):
-                resp = requests.get(f"{API_URL}/tools")
-                if resp.status_code == 200:
-                    st.session_state.tools_info = resp.json()
-                else:
-                    st.error(f"Failed to fetch tools: {resp.status_code}")
-        except Exception as e:
-            st.error(f"Connection error: {e}")
+    info = None
+    try:
+        info = fetch_tools(API_URL)
+    except httpx.HTTPStatusError as e:
+        st.error(f"Failed to fetch tools: {e.response.status_code}")
+    except Exception as e:
+        st.error(f"Connection error: {e}")
             
-    if "tools_info" in st.session_state:
-        info = st.session_state.tools_info
+    if info is not None:
         st.write(f"**MCP Server:** `{info.get('server_url', 'Unknown')}`")
         
         st.subheader("Available Tools")
@@ -62,6 +84,35 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _form_fields(payload):
+    """
+    (key, label) pairs for an elicitation form, computed once per elicitation
+    rather than on every rerun. v2 uses requestedSchema, v1 uses fields.
+    """
+    schema = payload.get("requestedSchema")
+    if schema:
+        return tuple((key, info.get("title", key)) for key, info in schema.get("properties", {}).items())
+    return tuple(
+        (field.get("name"), field.get("description", field.get("name")))
+        for field in payload.get("fields", [])
+    )
+
+def _ndjson_lines(response):
+    """
+    Yields the non-empty NDJSON lines of a streamed response as bytes.
+    """
+    buf = bytearray()
+    for chunk in response.iter_bytes():
+        buf.extend(chunk)
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            if nl > start:
+                yield bytes(buf[start:nl])
+            start = nl + 1
+        del buf[:start]
+    if buf:
+        yield bytes(buf)
+
 def handle_stream(response):
     """
     Consumes the stream from Backend.
@@ -70,50 +121,87 @@ def handle_stream(response):
     """
     full_response = ""
     message_placeholder = st.empty()
+    # Markdown re-renders are coalesced to at most one per RENDER_INTERVAL
+    rendered = ""
+    last_render = 0.0
     
     # Iterate over lines
-    for line in response.iter_lines():
-        if line:
-            try:
-                # Backend sends NDJSON
-                event = json.loads(line)
-                type = event.get("type")
-                content = event.get("content")
+    for line in _ndjson_lines(response):
+        # Backend sends NDJSON objects; skip heartbeats and other non-JSON lines
+        # without paying for a failed parse
+        if line[:1] != b"{":
+            continue
+        try:
+            event = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        type = event.get("type")
+        content = event.get("content")
+            
+        if type == "result" or type == "message":
+            full_response = content if isinstance(content, str) else str(content)
+            now = time.monotonic()
+            if now - last_render > RENDER_INTERVAL:
+                message_placeholder.markdown(full_response)
+                rendered, last_render = full_response, now
                 
-                if type == "result" or type == "message":
-                    full_response = str(content)
-                    message_placeholder.markdown(full_response)
-                    
-                elif type == "error":
-                    st.error(f"Error: {content}")
-                    st.session_state.messages.append({"role": "assistant", "content": f"Error: {content}"})
-                    return
-
-                elif type == "elicitation":
-                    # CRITICAL: We received an elicitation request.
-                    st.session_state.elicitation_active = True
-                    st.session_state.elicitation_data = event["content"] # {elicitation_type, data}
-                    
-                    # We do NOT append the partial response to history yet?
-                    # Or we do.
-                    # message_placeholder.empty() # Clear the "Thinking..." or partial?
-                    # Actually, we should probably keep the context?
-                    
-                    st.rerun() # Force rerun to render form
-                    return
+        elif type == "error":
+            st.error(f"Error: {content}")
+            st.session_state.messages.append({"role": "assistant", "content": f"Error: {content}"})
+            return
 
-            except json.JSONDecodeError:
-                pass
+        elif type == "elicitation":
+            # CRITICAL: We received an elicitation request.
+            st.session_state.elicitation_active = True
+            st.session_state.elicitation_data = event["content"] # {elicitation_type, data}
+            st.session_state.elicitation_fields = _form_fields(event["content"].get("data", {}))
+                
+            # We do NOT append the partial response to history yet?
+            # Or we do.
+            # message_placeholder.empty() # Clear the "Thinking..." or partial?
+            # Actually, we should probably keep the context?
+                
+            # The caller decides whether to rerun (see the chat input block)
+            return
     
     # Stream finished (Result)
+    if full_response != rendered:
+        message_placeholder.markdown(full_response)
     if full_response:
         st.session_state.messages.append({"role": "assistant", "content": full_response})
 
 # Display Chat History
-for msg in st.session_state.messages:
+# Only the latest HISTORY_LIMIT messages are drawn on every rerun; older ones
+# render only while the toggle is on (an expander would still render them).
+older = st.session_state.messages[:-HISTORY_LIMIT]
+if older and st.toggle(f"Show older ({len(older)})", key="show_older"):
+    for msg in older:
+        with st.chat_message(msg["role"]):
+            st.write(msg["content"])
+for msg in st.session_state.messages[-HISTORY_LIMIT:]:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
 
+# Standard Chat Input
+if not st.session_state.get("elicitation_active"):
+    if prompt := st.chat_input("Start a workflow... (e.g., 'book v2', 'login v2')"):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.write(prompt)
+
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                try:
+                    with _client().stream("POST", "/chat", json={"message": prompt, "user_id": "user1", "session_id": st.session_state.session_id}) as response:
+                        handle_stream(response)
+                except Exception as e:
+                    st.error(f"Connection Error: {e}")
+
+        # The chat input is already drawn in this pass and would sit next to
+        # the form, so rerun once to show the form without it
+        if st.session_state.elicitation_active:
+            st.rerun()
+
 # Elicitation Form Rendering
 if st.session_state.get("elicitation_active"):
     data = st.session_state.elicitation_data
@@ -146,23 +234,16 @@ if st.session_state.get("elicitation_active"):
                             context_data = payload.get("context_data", {})
                             submission["response_data"].update(context_data)
 
-                        response = requests.post(
-                            f"{API_URL}/submit_elicitation",
-                            json=submission,
-                            stream=True
-                        )
-                        st.session_state.elicitation_active = False
-                        st.session_state.elicitation_data = None
-                        handle_stream(response) # Resume stream!
+                        with _client().stream("POST", "/submit_elicitation", json=submission) as response:
+                            st.session_state.elicitation_active = False
+                            st.session_state.elicitation_data = None
+                            handle_stream(response) # Resume stream!
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error: {e}")
 
         else: # Form
             message = payload.get("message", "Please details")
-            # v2 uses requestedSchema, v1 uses fields
-            schema = payload.get("requestedSchema", {})
-            fields = payload.get("fields", [])
             is_v1 = payload.get("is_v1", False)
             tool_name = payload.get("tool_name", "")
 
@@ -171,18 +252,12 @@ if st.session_state.get("elicitation_active"):
             with st.form("elicitation_form"):
                 responses = {}
                 
-                if schema:
-                    # v2 Schema
-                    props = schema.get("properties", {})
-                    for key, info in props.items():
-                        title = info.get("title", key)
-                        responses[key] = st.text_input(title)
-                elif fields:
-                    # v1 Fields
-                    for field in fields:
-                        name = field.get("name")
-                        desc = field.get("description", name)
-                        responses[name] = st.text_input(desc)
+                fields = st.session_state.elicitation_fields
+                # Side by side, wrapping after FORM_COLUMNS inputs
+                cols = st.columns(min(len(fields), FORM_COLUMNS) or 1)
+                for i, (key, label) in enumerate(fields):
+                    with cols[i % len(cols)]:
+                        responses[key] = st.text_input(label)
                     
                 if st.form_submit_button("Submit"):
                      with st.spinner("Submitting..."):
@@ -200,33 +275,10 @@ if st.session_state.get("elicitation_active"):
                                 context_data = payload.get("context_data", {})
                                 submission["response_data"].update(context_data)
 
-                            response = requests.post(
-                                f"{API_URL}/submit_elicitation",
-                                json=submission,
-                                stream=True
-                            )
-                            st.session_state.elicitation_active = False
-                            st.session_state.elicitation_data = None
-                            handle_stream(response) # Resume stream!
+                            with _client().stream("POST", "/submit_elicitation", json=submission) as response:
+                                st.session_state.elicitation_active = False
+                                st.session_state.elicitation_data = None
+                                handle_stream(response) # Resume stream!
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
-
-else:
-    # Standard Chat Input
-    if prompt := st.chat_input("Start a workflow... (e.g., 'book v2', 'login v2')"):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.write(prompt)
-
-        with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    response = requests.post(
-                        f"{API_URL}/chat",
-                        json={"message": prompt, "user_id": "user1", "session_id": st.session_state.session_id},
-                        stream=True
-                    )
-                    handle_stream(response)
-                except Exception as e:
-                    st.error(f"Connection Error: {e}")